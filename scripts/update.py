@@ -3,15 +3,16 @@
 
 """Helm Template Processing Script."""
 
+import argparse
+import asyncio
+import hashlib
 import logging
-import shlex
+import os
+import shutil
 import subprocess
 import sys
-import tempfile
 from pathlib import Path
-from typing import List, Optional, Tuple
-
-from packaging.version import InvalidVersion, Version
+from typing import Dict, List, Optional, Tuple
 
 logging.basicConfig(level=logging.INFO)
 log = logging.getLogger(__name__)
@@ -28,6 +29,18 @@ CONFIG = {
     "values_file": "values.yaml",
 }
 
+# NOTE: The first line of every generated manifest records the inputs it was
+# rendered from, so unchanged versions can be skipped on later runs.
+CACHE_KEY_PREFIX = "# update.py cache-key: "
+
+# NOTE: 'changeme' is the release name, the charm
+# takes care of adding the required prefixes to
+# differentiate each deployment.
+RELEASE_PREFIX = b"changeme-"
+
+# Size of the chunks read from the rendered template.
+CHUNK_SIZE = 64 * 1024
+
 
 class GitRepository:
     """Handles git repository ops."""
@@ -37,83 +50,192 @@ class GitRepository:
         self.local_path = Path(local_path)
 
     def clone(self) -> None:
-        """Clone repository."""
+        """Clone the repository without a working tree.
+
+        This is a partial clone: blobs are only fetched on demand, when the
+        tree of a tag is exported.
+        """
         print(f"Cloning repository from {self.repo_url}...")
         subprocess.check_call(
-            ["git", "clone", self.repo_url, str(self.local_path)],
+            [
+                "git",
+                "clone",
+                "--filter=blob:none",
+                "--no-checkout",
+                "--bare",
+                self.repo_url,
+                str(self.local_path),
+            ],
             text=True,
         )
         print(f"Clone successful to {self.local_path}")
 
-    def get_tags(self) -> List[str]:
-        """Get all tags from the repository.
+    def list_remote_tags(self, prefix: str = "") -> List[str]:
+        """List the tags of the remote repository, sorted by version.
+
+        This does not require a local clone.
+
+        Args:
+            prefix: Only list tags starting with this prefix
 
         Returns:
             List of tag names
         """
         result = subprocess.run(
-            ["git", "tag", "-l"],
-            cwd=self.local_path,
+            [
+                "git",
+                "ls-remote",
+                "--tags",
+                "--refs",
+                "--sort=v:refname",
+                self.repo_url,
+                f"refs/tags/{prefix}*",
+            ],
             capture_output=True,
             text=True,
             check=True,
         )
-        tags = result.stdout.strip().split("\n")
-        return [tag for tag in tags if tag]
+        refs = (line.split("\t", 1)[-1] for line in result.stdout.splitlines())
+        return [ref.removeprefix("refs/tags/") for ref in refs if ref]
 
-    def checkout_tag(self, tag: str):
-        """Checkout a specific tag.
+    def get_tree_ids(self, tags: List[str], path: str) -> Dict[str, str]:
+        """Get the object ids of a path within the trees of several tags.
 
         Args:
-            tag: Tag name to checkout
+            tags: Tag names
+            path: Path within the tree of each tag
+
+        Returns:
+            Mapping of tag name to the object id of the tree at the given path
         """
-        subprocess.run(
-            ["git", "checkout", tag],
+        result = subprocess.run(
+            ["git", "rev-parse", *(f"{tag}:{path}" for tag in tags)],
             cwd=self.local_path,
             capture_output=True,
             text=True,
             check=True,
         )
-        print(f"Checked out tag: {tag}")
-
+        return dict(zip(tags, result.stdout.split()))
 
-class HelmProcessor:
-    """Handles Helm template generation operations."""
+    async def export_tree(self, tag: str, dest: Path, path: str = "."):
+        """Export the tree of a tag without touching HEAD or the index.
 
-    @staticmethod
-    def generate_template(chart_path: Path, output_file: Path, values_file: Optional[Path] = None):
-        """Generate Helm template and save to a file.
+        The tree is streamed from 'git archive' straight into 'tar', so
+        several tags can be exported concurrently off the same repository.
 
         Args:
-            chart_path: Path to the Helm chart directory
-            output_file: Path where to save the generated template.
-            values_file: Path to the custom Helm values used to render the template.
+            tag: Tag name to export
+            dest: Directory where the tree is extracted
+            path: Only export this path of the tree
         """
-        output_file.parent.mkdir(parents=True, exist_ok=True)
+        dest.mkdir(parents=True, exist_ok=True)
+        archive_cmd = ["git", "archive", "--format=tar", tag, "--", path]
+        extract_cmd = ["tar", "-x", "-C", str(dest)]
+
+        read_fd, write_fd = os.pipe()
+        try:
+            archive = await asyncio.create_subprocess_exec(
+                *archive_cmd, cwd=self.local_path, stdout=write_fd
+            )
+            try:
+                extract = await asyncio.create_subprocess_exec(*extract_cmd, stdin=read_fd)
+            except BaseException:
+                archive.kill()
+                await archive.wait()
+                raise
+        finally:
+            os.close(read_fd)
+            os.close(write_fd)
+
+        rcs = await asyncio.gather(archive.wait(), extract.wait())
+        for rc, cmd in zip(rcs, (archive_cmd, extract_cmd)):
+            if rc != 0:
+                raise subprocess.CalledProcessError(rc, cmd)
+        print(f"Exported tag {tag} into {dest}")
+
 
-        if not chart_path.exists():
-            raise RuntimeError(f"Helm chart path missing: {chart_path}")
+class HelmProcessor:
+    """Handles Helm template generation operations."""
 
-        cmd = 'helm template . --name-template "changeme"'
-        if values_file and values_file.exists():
-            cmd += f" -f {str(values_file)}"
+    @staticmethod
+    def get_version() -> str:
+        """Get the version of the Helm client.
 
+        Returns:
+            Short version string of the Helm client
+        """
         result = subprocess.run(
-            shlex.split(cmd),
-            cwd=chart_path,
+            ["helm", "version", "--short"],
             capture_output=True,
             text=True,
             check=True,
         )
+        return result.stdout.strip()
+
+    @staticmethod
+    async def generate_template(
+        chart_path: Path,
+        output_file: Path,
+        values_file: Optional[Path] = None,
+        cache_key: Optional[str] = None,
+    ):
+        """Generate Helm template and save to a file.
+
+        The directory of the output file must already exist.
 
-        output = result.stdout
-        # NOTE: 'changeme' is the release name, the charm
-        # takes care of adding the required prefixes to
-        # differentiate each deployment.
-        output = output.replace("changeme-", "")
+        Args:
+            chart_path: Path to the Helm chart directory
+            output_file: Path where to save the generated template.
+            values_file: Path to the existing custom Helm values used to render the template.
+            cache_key: Key identifying the inputs of the template, written as
+                the first line of the output.
+        """
+        chart_dir = str(chart_path)
+        try:
+            os.stat(chart_dir)
+        except FileNotFoundError:
+            raise RuntimeError(f"Helm chart path missing: {chart_path}") from None
+
+        cmd = ["helm", "template", ".", "--name-template", "changeme"]
+        if values_file:
+            cmd += ["-f", str(values_file)]
+
+        proc = await asyncio.create_subprocess_exec(
+            *cmd,
+            cwd=chart_dir,
+            stdin=asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+        )
+        assert proc.stdout is not None and proc.stderr is not None
+        stderr_task = asyncio.ensure_future(proc.stderr.read())
 
-        with open(output_file, "w") as f:
-            f.write(output)
+        # NOTE: The template is streamed to a temporary file, which only
+        # replaces the output once helm succeeded.
+        partial_file = output_file.with_name(f".{output_file.name}.partial")
+        try:
+            with open(partial_file, "wb") as f:
+                if cache_key:
+                    f.write(f"{CACHE_KEY_PREFIX}{cache_key}\n".encode())
+                carry = b""
+                while chunk := await proc.stdout.read(CHUNK_SIZE):
+                    data = carry + chunk
+                    # Hold back a tail that may be the start of a release
+                    # prefix continuing in the next chunk.
+                    cut = max(len(data) - len(RELEASE_PREFIX) + 1, 0)
+                    last = data.rfind(RELEASE_PREFIX)
+                    if last != -1 and last + len(RELEASE_PREFIX) > cut:
+                        cut = last + len(RELEASE_PREFIX)
+                    f.write(data[:cut].replace(RELEASE_PREFIX, b""))
+                    carry = data[cut:]
+                f.write(carry)
+
+            stderr = await stderr_task
+            if await proc.wait() != 0:
+                raise subprocess.CalledProcessError(proc.returncode or 0, cmd, stderr=stderr)
+            os.replace(partial_file, output_file)
+        finally:
+            partial_file.unlink(missing_ok=True)
 
         print(f"Generated template saved to: {output_file}")
 
@@ -121,8 +243,9 @@ class HelmProcessor:
 class ManifestsProcessor:
     """Main processor class for manifest updates."""
 
-    def __init__(self, config: dict):
+    def __init__(self, config: dict, force: bool = False):
         self.config = config
+        self.force = force
         self.original_dir = Path.cwd()
         self.script_dir = Path(__file__).parent.absolute()
 
@@ -133,19 +256,99 @@ class ManifestsProcessor:
             print(f"No values file found at: {self.values_file}")
             self.values_file = None
 
+        self.values_digest = (
+            hashlib.sha256(self.values_file.read_bytes()).hexdigest() if self.values_file else ""
+        )
+
+    def output_file(self, version: str) -> Path:
+        """Get the path of the generated manifest for a version.
+
+        Args:
+            version: Version string
+
+        Returns:
+            Path of the generated manifest
+        """
+        output_dir = self.original_dir / self.config["output_base_dir"] / version
+        return output_dir / self.config["output_manifest_name"]
+
+    def render_inputs(self, helm_version: str) -> str:
+        """Describe the inputs every manifest is rendered with, besides its chart.
+
+        Args:
+            helm_version: Version of the Helm client
+
+        Returns:
+            Description of the Helm values and client in use
+        """
+        return f"values={self.values_digest} helm={helm_version}"
+
+    def cache_key(self, tree_id: str, helm_version: str) -> str:
+        """Build the key identifying the inputs a manifest is rendered from.
+
+        Args:
+            tree_id: Object id of the Helm chart tree
+            helm_version: Version of the Helm client
+
+        Returns:
+            Cache key for the rendered manifest
+        """
+        return f"chart={tree_id} {self.render_inputs(helm_version)}"
+
+    def is_rendered(self, version: str, helm_version: str) -> bool:
+        """Check whether a version was rendered with the current values and Helm client.
+
+        Tags are immutable, so the chart of an already rendered version is
+        assumed to be unchanged.
+
+        Args:
+            version: Version string
+            helm_version: Version of the Helm client
+
+        Returns:
+            True if the manifest of the version exists and is current
+        """
+        cache_key = self.read_cache_key(self.output_file(version))
+        if not cache_key:
+            return False
+        _, _, render_inputs = cache_key.partition(" ")
+        return render_inputs == self.render_inputs(helm_version)
+
+    @staticmethod
+    def read_cache_key(output_file: Path) -> Optional[str]:
+        """Read the cache key recorded in a generated manifest.
+
+        Args:
+            output_file: Path of the generated manifest
+
+        Returns:
+            The recorded cache key, or None if the manifest is missing or has no key
+        """
+        try:
+            with open(output_file) as f:
+                first_line = f.readline()
+        except FileNotFoundError:
+            return None
+        if not first_line.startswith(CACHE_KEY_PREFIX):
+            return None
+        return first_line[len(CACHE_KEY_PREFIX) :].strip()
+
     def filter_tags(self, tags: List[str]) -> List[Tuple[str, str]]:
         """Filter tags based on prefix, versions and exclusions.
 
         Args:
-            tags: List of all tags
+            tags: List of tags, sorted by version
 
         Returns:
-            List of tuples (tag_name, version) for selected tags
+            List of tuples (tag_name, version) for selected tags, in the order of tags
         """
+        from packaging.version import InvalidVersion, Version
+
         filtered_tags = []
         tag_prefix = self.config["tag_prefix"]
+        prefix_len = len(tag_prefix)
         start_version = self.config["start_version"]
-        excluded_versions = self.config["excluded_versions"]
+        excluded_versions = set(self.config["excluded_versions"])
 
         try:
             start_version_obj = Version(start_version)
@@ -157,7 +360,7 @@ class ManifestsProcessor:
             if not tag.startswith(tag_prefix):
                 continue
 
-            version_str = tag[len(tag_prefix) :]
+            version_str = tag[prefix_len:]
             try:
                 version_obj = Version(version_str)
                 if version_obj < start_version_obj:
@@ -172,46 +375,67 @@ class ManifestsProcessor:
                 print(f"Skipping tag {tag} due to invalid version format: {version_str}")
                 continue
 
-        filtered_tags.sort(key=lambda x: Version(x[1]))
-
         return filtered_tags
 
-    def process_tag(self, repo: GitRepository, tag: str, version: str):
-        """Process a single tag: checkout, generate template, save output.
+    async def process_tag(self, tree: Path, tag: str, version: str, cache_key: str):
+        """Process a single tag: generate template, save output.
 
         Args:
-            repo: GitRepository instance
+            tree: Path to an export of the tag
             tag: Tag name
             version: Version string
+            cache_key: Key identifying the inputs of the template
         """
         print(f"\nProcessing tag: {tag} (version: {version})")
 
-        repo.checkout_tag(tag)
+        chart_path = tree / self.config["helm_chart_path"]
+        output_file = self.output_file(version)
 
-        chart_path = repo.local_path / self.config["helm_chart_path"]
-        output_dir = self.original_dir / self.config["output_base_dir"] / version
-        output_file = output_dir / self.config["output_manifest_name"]
+        await HelmProcessor.generate_template(chart_path, output_file, self.values_file, cache_key)
+
+    async def export_and_process_tag(
+        self,
+        limit: asyncio.Semaphore,
+        repo: GitRepository,
+        tree: Path,
+        tag: str,
+        version: str,
+        cache_key: str,
+    ):
+        """Export the chart of a tag into its own directory and process it.
 
-        HelmProcessor.generate_template(chart_path, output_file, self.values_file)
+        Args:
+            limit: Semaphore bounding how many tags are processed at once
+            repo: GitRepository instance
+            tree: Path where the tag is exported
+            tag: Tag name
+            version: Version string
+            cache_key: Key identifying the inputs of the template
+        """
+        async with limit:
+            await repo.export_tree(tag, tree, self.config["helm_chart_path"])
+            await self.process_tag(tree, tag, version, cache_key)
+        print(f"Tag '{tag}' processed.")
 
-    def run(self):
+    async def run(self):
         """Execute the update process."""
         print("Updating manifests...")
         print(f"Repository URL: {self.config['repo_url']}")
         print(f"Start version: {self.config['start_version']}")
         print(f"Excluded versions: {self.config['excluded_versions']}")
 
+        import tempfile
+
         with tempfile.TemporaryDirectory() as temp_dir:
             repo_path = Path(temp_dir) / "repo"
             repo = GitRepository(self.config["repo_url"], str(repo_path))
 
-            repo.clone()
-            tags = repo.get_tags()
+            tags = repo.list_remote_tags(self.config["tag_prefix"])
 
             if not tags:
                 raise RuntimeError("No tags found in repository")
 
-            print(f"Found {len(tags)} total tags")
+            print(f"Found {len(tags)} tags with prefix '{self.config['tag_prefix']}'")
 
             selected_tags = self.filter_tags(tags)
 
@@ -223,9 +447,42 @@ class ManifestsProcessor:
             for tag, version in selected_tags:
                 print(f"  - {tag} ({version})")
 
+            helm_version = HelmProcessor.get_version()
+            if not self.force and all(
+                self.is_rendered(version, helm_version) for _, version in selected_tags
+            ):
+                print("All selected versions are up to date, nothing to clone.")
+                return
+
+            repo.clone()
+            tree_ids = repo.get_tree_ids(
+                [tag for tag, _ in selected_tags], self.config["helm_chart_path"]
+            )
+            pending_tags = []
             for tag, version in selected_tags:
-                self.process_tag(repo, tag, version)
-                print(f"Tag '{tag}' processed.")
+                cache_key = self.cache_key(tree_ids[tag], helm_version)
+                if not self.force and self.read_cache_key(self.output_file(version)) == cache_key:
+                    print(f"Tag '{tag}' is up to date, skipping.")
+                    continue
+                pending_tags.append((tag, version, cache_key))
+
+            for _, version, _ in pending_tags:
+                self.output_file(version).parent.mkdir(parents=True, exist_ok=True)
+
+            exports_path = Path(temp_dir) / "exports"
+            limit = asyncio.Semaphore(min(8, os.cpu_count() or 1))
+            results = await asyncio.gather(
+                *(
+                    self.export_and_process_tag(
+                        limit, repo, exports_path / tag, tag, version, cache_key
+                    )
+                    for tag, version, cache_key in pending_tags
+                ),
+                return_exceptions=True,
+            )
+            for result in results:
+                if isinstance(result, BaseException):
+                    raise result
 
 
 def check_dependencies() -> bool:
@@ -234,12 +491,10 @@ def check_dependencies() -> bool:
     Returns:
         True if all dependencies are available, False otherwise
     """
-    dependencies = ["git", "helm"]
+    dependencies = ["git", "helm", "tar"]
 
     for dep in dependencies:
-        try:
-            subprocess.run([dep, "version"], capture_output=True, check=True)
-        except (subprocess.CalledProcessError, FileNotFoundError):
+        if shutil.which(dep) is None:
             print(f"Error: {dep} is not installed or not in PATH")
             return False
 
@@ -248,13 +503,21 @@ def check_dependencies() -> bool:
 
 def main():
     """Start the script."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Render every selected version, even if its manifest is up to date.",
+    )
+    args = parser.parse_args()
+
     if not check_dependencies():
         print("Please install missing system dependencies and try again.")
         sys.exit(1)
 
     try:
-        processor = ManifestsProcessor(CONFIG)
-        processor.run()
+        processor = ManifestsProcessor(CONFIG, force=args.force)
+        asyncio.run(processor.run())
     except Exception as e:
         print(f"Error: {e}")
         sys.exit(1)
@@ -4,8 +4,8 @@
 """Patches for managing rawfile-localpv manifests."""
 
 import logging
-from functools import cached_property
-from typing import Dict, Optional, Protocol
+from functools import cached_property, lru_cache
+from typing import ClassVar, Dict, FrozenSet, List, Optional, Protocol
 
 from lightkube.codecs import AnyResource
 from lightkube.core.resource import NamespacedResource
@@ -56,6 +56,8 @@ class CSIDriverNameMixin:
 class ConfigureStorageClass(CSIDriverNameMixin, Patch):
     """Patch to adjust the StorageClass attributes."""
 
+    TARGET_KINDS: ClassVar[FrozenSet[str]] = frozenset({"StorageClass"})
+
     def __call__(self, obj: AnyResource) -> None:
         """Adjust the StorageClass."""
         if not isinstance(obj, StorageClass):
@@ -85,6 +87,8 @@ class ConfigureStorageClass(CSIDriverNameMixin, Patch):
 class UpdateCSIDriverName(CSIDriverNameMixin, Patch):
     """Patch to adjust the CSI driver name for the csi-driver container."""
 
+    TARGET_KINDS: ClassVar[FrozenSet[str]] = frozenset({"DaemonSet", "StatefulSet"})
+
     def __call__(self, obj: AnyResource) -> None:
         """Update the CSIDriverName."""
         if not isinstance(obj, (DaemonSet, StatefulSet)):
@@ -116,28 +120,27 @@ class UpdateCSIDriverName(CSIDriverNameMixin, Patch):
 class DaemonSetAdjustments(Patch):
     """Patch to adjust the DaemonSet for the rawfile-csi-node."""
 
+    TARGET_KINDS: ClassVar[FrozenSet[str]] = frozenset({"DaemonSet"})
+
+    @staticmethod
+    @lru_cache(maxsize=4)
+    def _parse_selector(raw_config: str) -> Dict[str, str]:
+        """Parse space separated key=value pairs, ignoring malformed items."""
+        return {
+            key: value
+            for key, sep, value in (item.partition("=") for item in raw_config.split())
+            if key and sep
+        }
+
     def _parse_node_selector(self) -> Optional[Dict[str, str]]:
         """Parse the node selector configuration into a dictionary."""
-        parsed = {}
         raw_config = self.manifests.config.get(NODE_SELECTOR_CONFIG)
         if not raw_config:
             log.info("No node selector configuration found.")
             return None
 
-        selector_strings = raw_config.split(" ")
-        for item_str in selector_strings:
-            clean_item_str = item_str.strip()
-
-            if not clean_item_str:
-                continue
-
-            parts = clean_item_str.split("=", 1)
-            if len(parts) == 2:
-                key = parts[0].strip()
-                value = parts[1].strip()
-                if key:
-                    parsed[key] = value
-        return parsed
+        # NOTE: Copy the cached result, the resource owns its node selector.
+        return dict(self._parse_selector(raw_config))
 
     def __call__(self, obj: AnyResource) -> None:
         """Adjust the DaemonSet to adhere with the charm configuration."""
@@ -172,14 +175,13 @@ class DaemonSetAdjustments(Patch):
             return
 
         pod_spec.nodeSelector = self._parse_node_selector()
+        socket_dir = f"/var/lib/kubelet/plugins/{self.manifests.model.app.name}-rawfile-csi"
 
         for vol in pod_spec.volumes:
             if vol.name == "socket-dir":
                 host_path = vol.hostPath
                 if host_path:
-                    host_path.path = (
-                        f"/var/lib/kubelet/plugins/{self.manifests.model.app.name}-rawfile-csi"
-                    )
+                    host_path.path = socket_dir
             if vol.name == "data-dir":
                 host_path = vol.hostPath
                 if host_path:
@@ -211,10 +213,7 @@ class DaemonSetAdjustments(Patch):
 
                 for env in env_vars:
                     if env.name == "DRIVER_REG_SOCK_PATH":
-                        env.value = (
-                            f"/var/lib/kubelet/plugins/"
-                            f"{self.manifests.model.app.name}-rawfile-csi/csi.sock"
-                        )
+                        env.value = f"{socket_dir}/csi.sock"
                         break
                 break
 
@@ -232,6 +231,8 @@ class AdjustNamespace(Patch):
 class CSIDriverAdjustments(CSIDriverNameMixin, Patch):
     """Patch class to adjust the CSIDriver name."""
 
+    TARGET_KINDS: ClassVar[FrozenSet[str]] = frozenset({"CSIDriver"})
+
     def __call__(self, obj: AnyResource) -> None:
         """Adjust the CSIDriverName."""
         if not obj.metadata or not obj.metadata.name:
@@ -243,18 +244,22 @@ class CSIDriverAdjustments(CSIDriverNameMixin, Patch):
 class RBACAdjustments(Patch):
     """Patch class to adjust RBAC resource names and namespaces."""
 
-    def _rename(self, name: str) -> str:
+    TARGET_KINDS: ClassVar[FrozenSet[str]] = frozenset(
+        {"ClusterRole", "ClusterRoleBinding", "RoleBinding"}
+    )
+
+    def _rename(self, name: str, formatter: Optional[str]) -> str:
         """Rename the resource using the specified formatter.
 
         Arguments:
             name: The original name of the resource.
+            formatter: The configured RBAC name formatter.
 
         Returns:
             The formatted name, or the original name if the formatter is missing.
         """
-        formatter = self.manifests.config.get(RBAC_FORMATTER_CONFIG)
         if not formatter:
-            log.warning("%s is empty. Fallback to default name.")
+            log.warning("%s is empty. Fallback to default name.", RBAC_FORMATTER_CONFIG)
             return name
 
         fmt_context = {"name": name, "app": self.manifests.model.app.name}
@@ -262,27 +267,56 @@ class RBACAdjustments(Patch):
 
     def __call__(self, obj: AnyResource) -> None:
         """Adjust the RBAC resource names and namespaces."""
-        ns = self.manifests.config.get(NAMESPACE_CONFIG)
+        config = self.manifests.config
+        ns = config.get(NAMESPACE_CONFIG)
+        formatter = config.get(RBAC_FORMATTER_CONFIG)
         if not obj.metadata or not obj.metadata.name:
             log.error("Resource is missing metadata or name: %s. Skipping patch.", obj)
             return
 
         if isinstance(obj, (ClusterRole, ClusterRoleBinding)):
-            obj.metadata.name = self._rename(obj.metadata.name)
+            obj.metadata.name = self._rename(obj.metadata.name, formatter)
 
         if isinstance(obj, (ClusterRoleBinding, RoleBinding)):
             for subject in obj.subjects or []:
                 if subject.kind == "ServiceAccount":
                     subject.namespace = ns
             if obj.roleRef.kind == "ClusterRole":
-                obj.roleRef.name = self._rename(obj.roleRef.name)
+                obj.roleRef.name = self._rename(obj.roleRef.name, formatter)
+
+
+class DispatchingPatchChain(Patch):
+    """Patch running only the patches relevant to the kind of each resource.
+
+    Patches declaring ``TARGET_KINDS`` are only applied to resources of
+    those kinds, any other patch is applied to every resource. Patches keep
+    their relative order.
+    """
+
+    def __init__(self, manifests: Manifests, patches: List[Patch]):
+        super().__init__(manifests)
+        self.patches = patches
+        self._by_kind: Dict[str, List[Patch]] = {}
+
+    def _patches_for(self, kind: str) -> List[Patch]:
+        """Return the patches to apply to resources of the given kind."""
+        if kind not in self._by_kind:
+            self._by_kind[kind] = [
+                patch for patch in self.patches if kind in getattr(patch, "TARGET_KINDS", (kind,))
+            ]
+        return self._by_kind[kind]
+
+    def __call__(self, obj: AnyResource) -> None:
+        """Apply the relevant patches to the resource."""
+        for patch in self._patches_for(obj.kind):
+            patch(obj)
 
 
 class RawfileLocalPVManifests(Manifests):
     """Class for managing rawfile-localpv resources."""
 
     def __init__(self, charm):
-        manipulations = [
+        patches: List[Patch] = [
             AdjustNamespace(self),
             ConfigureStorageClass(self),
             CSIDriverAdjustments(self),
@@ -292,19 +326,22 @@ class RawfileLocalPVManifests(Manifests):
             UpdateCSIDriverName(self),
         ]
 
-        super().__init__("rawfile-local-pv", charm.model, "upstream", manipulations)
+        super().__init__(
+            "rawfile-local-pv", charm.model, "upstream", [DispatchingPatchChain(self, patches)]
+        )
         self.charm_config = charm.config
+        self._config: Optional[Dict] = None
 
     @property
     def config(self) -> Dict:
         """Return a cleaned up configuration dictionary.
 
+        The dictionary is built once per charm instance and reused by every
+        manipulation; ops builds a new charm for each dispatch.
+
         Returns:
             Dict[str, str]: The cleaned configuration dictionary.
         """
-        config = dict(self.charm_config)
-
-        keys_to_remove = [k for k, v in config.items() if v in ("", None)]
-        for k in keys_to_remove:
-            del config[k]
-        return config
+        if self._config is None:
+            self._config = {k: v for k, v in self.charm_config.items() if v not in ("", None)}
+        return self._config
@@ -2,16 +2,29 @@
 # See LICENSE file for licensing details.
 
 import logging
+import os
 import re
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Generator
+from types import SimpleNamespace
+from typing import Dict, Generator, Tuple
 
 import jubilant
 import pytest
+import utils
 import yaml
+from kubernetes import client, config
 
 log = logging.getLogger(__name__)
 
+# NOTE: Prefer the libyaml backed dumper when PyYAML was built with it.
+YAML_DUMPER = getattr(yaml, "CSafeDumper", yaml.SafeDumper)
+
+_CHARM_RE = re.compile(r"^(?P<name>[^_]+)_(?P<base>ubuntu-\d+\.\d+)-(?P<arch>amd64|arm64)\.charm$")
+
+# Resolved charm file paths keyed by (base, arch).
+CharmIndex = Dict[Tuple[str, str], str]
+
 K8S_CONSTRAINTS = {
     "cores": "2",
     "mem": "8G",
@@ -66,7 +79,7 @@ def pytest_addoption(parser: pytest.Parser):
     )
 
 
-@pytest.fixture(scope="module")
+@pytest.fixture(scope="session")
 def juju(request: pytest.FixtureRequest):
     keep_models = bool(request.config.getoption("--keep-models"))
 
@@ -80,60 +93,95 @@ def juju(request: pytest.FixtureRequest):
             print(log, end="")
 
 
-@pytest.fixture(scope="module")
-def charm_path(request: pytest.FixtureRequest) -> Path:
-    """Return the Path to charm file matching the specified base."""
+@pytest.fixture(scope="session")
+def charm_index(request: pytest.FixtureRequest) -> CharmIndex:
+    """Return the resolved paths of the provided charm files, keyed by (base, arch)."""
+    charm_files = request.config.getoption("charm_files")
+    print("Charm files provided:", charm_files)
+
+    index = {}
+    for charm_file in charm_files:
+        path = Path(charm_file)
+        match = _CHARM_RE.match(path.name)
+        if not match:
+            log.warning("Ignoring charm file with unexpected name: %s", charm_file)
+            continue
+        index.setdefault((match["base"], match["arch"]), os.fspath(path.resolve()))
+    return index
+
+
+@pytest.fixture(scope="session")
+def charm_base(request: pytest.FixtureRequest) -> str:
+    """Return the charmcraft base to test against, e.g. 'ubuntu-22.04'."""
     base = request.config.getoption("base")
     if not base:
         pytest.fail("No --base option provided to pytest.")
 
     # NOTE: (mateo) The base string uses '@' as a separator, but charmcraft uses
     # '-' instead.
-    base = str(base).replace("@", "-")
-    charm_files = request.config.getoption("charm_files")
-    print("Charm files provided:", charm_files)
-    charm_file = next((Path(f) for f in charm_files if base in Path(f).name), None)
-    if not charm_file:
-        pytest.fail(f"No charm file found for base '{base}'. Charm files provided: {charm_files}")
+    return str(base).replace("@", "-")
 
-    assert charm_file is not None
-    return charm_file.resolve()
 
+@pytest.fixture(scope="session")
+def arch(charm_index: CharmIndex, charm_base: str) -> str:
+    """Return the architecture of the first charm file built for the base."""
+    arch = next((arch for base, arch in charm_index if base == charm_base), None)
+    if not arch:
+        pytest.fail(
+            f"No charm file found for base '{charm_base}'. Charm files provided: {charm_index}"
+        )
 
-@pytest.fixture(scope="module")
-def arch(charm_path: Path):
-    match = re.search(r"(arm64|amd64)", str(charm_path))
-    return match.group(1) if match else "amd64"
+    assert arch is not None
+    return arch
 
 
-@pytest.fixture(scope="module")
+@pytest.fixture(scope="session")
+def charm_path(charm_index: CharmIndex, charm_base: str, arch: str) -> str:
+    """Return the path to charm file matching the specified base."""
+    return charm_index[(charm_base, arch)]
+
+
+@pytest.fixture(scope="session")
 def kubernetes_cluster(juju: jubilant.Juju, request: pytest.FixtureRequest, arch: str):
     base = request.config.getoption("base")
     constraints = {**K8S_CONSTRAINTS, "arch": arch}
-    juju.deploy(
-        charm="k8s",
-        channel="latest/edge",
-        constraints=constraints,
-        base=base,
-        config={"local-storage-enabled": False, "node-labels": "storagePool=primary"},
-        num_units=2,
-    )
-    juju.deploy(
-        charm="k8s-worker",
-        channel="latest/edge",
-        constraints=constraints,
-        base=base,
-        config={"node-labels": "storagePool=secondary"},
-    )
-    juju.integrate("k8s", "k8s-worker:cluster")
-    juju.integrate("k8s", "k8s-worker:containerd")
-    juju.integrate("k8s", "k8s-worker:cos-tokens")
-    juju.wait(jubilant.all_active)
+    # NOTE: The juju CLI calls block on the controller, so independent
+    # deploys and integrations are issued concurrently.
+    with ThreadPoolExecutor() as executor:
+        deploys = [
+            executor.submit(
+                juju.deploy,
+                charm="k8s",
+                channel="latest/edge",
+                constraints=constraints,
+                base=base,
+                config={"local-storage-enabled": False, "node-labels": "storagePool=primary"},
+                num_units=2,
+            ),
+            executor.submit(
+                juju.deploy,
+                charm="k8s-worker",
+                channel="latest/edge",
+                constraints=constraints,
+                base=base,
+                config={"node-labels": "storagePool=secondary"},
+            ),
+        ]
+        for deploy in deploys:
+            deploy.result()
+
+        integrations = [
+            executor.submit(juju.integrate, "k8s", f"k8s-worker:{endpoint}")
+            for endpoint in ("cluster", "containerd", "cos-tokens")
+        ]
+        for integration in integrations:
+            integration.result()
+    juju.wait(jubilant.all_active, delay=utils.JUJU_WAIT_DELAY)
 
     yield juju.model
 
 
-@pytest.fixture(scope="module")
+@pytest.fixture(scope="session")
 def kubeconfig(
     juju: jubilant.Juju, tmp_path_factory: pytest.TempPathFactory
 ) -> Generator[Path, None, None]:
@@ -147,8 +195,30 @@ def kubeconfig(
 
     kubeconfig = task.results.get("kubeconfig")
     if not kubeconfig:
-        log.error("'get-kubeconfig' action results: %s", yaml.safe_dump(task.results))
+        log.error(
+            "'get-kubeconfig' action results: %s", yaml.dump(task.results, Dumper=YAML_DUMPER)
+        )
         pytest.fail("Failed to copy kubeconfig from k8s")
 
-    kubeconfig_path.write_text(kubeconfig)
+    kubeconfig_path.write_bytes(kubeconfig.encode())
     yield kubeconfig_path
+
+
+@pytest.fixture(scope="session")
+def k8s_clients(kubeconfig: Path) -> SimpleNamespace:
+    """Return Kubernetes API clients sharing one connection pool.
+
+    The kubeconfig is parsed once, without touching the global default
+    configuration of the kubernetes package. Do not close the returned
+    ApiClient, it lives for the whole session.
+    """
+    configuration = client.Configuration()
+    # NOTE: Tests issue concurrent requests from thread pools, the default
+    # pool (5 connections per CPU) is small on CI runners.
+    configuration.connection_pool_maxsize = 32
+    api = config.new_client_from_config(str(kubeconfig), client_configuration=configuration)
+    return SimpleNamespace(
+        api=api,
+        core_v1=client.CoreV1Api(api),
+        storage_v1=client.StorageV1Api(api),
+    )
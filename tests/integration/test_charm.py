@@ -12,21 +12,17 @@ These tests verify:
 """
 
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import List
+from types import SimpleNamespace
 
 import jubilant
 import pytest
 import utils
-import yaml
-from kubernetes import client, config
 from kubernetes import utils as k8s_utils
 
 logger = logging.getLogger(__name__)
 
-METADATA = yaml.safe_load(Path("charmcraft.yaml").read_text())
-APP_NAME = METADATA["name"]
-
 # Namespace constants
 PRIMARY_NAMESPACE = "primary"
 SECONDARY_NAMESPACE = "secondary"
@@ -41,13 +37,14 @@ SECONDARY_RESOURCES = [
     {"kind": "Pod", "name": "secondary-pod"},
     {"kind": "PersistentVolumeClaim", "name": "secondary-pvc"},
 ]
+DATA_PATH = Path("tests/integration/data")
 
 
 @pytest.mark.usefixtures("kubernetes_cluster")
 class TestDeployment:
     """Test suite for charm deployment and configuration."""
 
-    def test_deploy_pools(self, juju: jubilant.Juju, charm_path: Path):
+    def test_deploy_pools(self, juju: jubilant.Juju, charm_path: str):
         """Test deploying multiple storage pools with different configurations.
 
         This test verifies that:
@@ -56,40 +53,44 @@ class TestDeployment:
         - Node selectors are properly configured
         - Charms reach active status after integration
         """
-        juju.deploy(
-            charm=charm_path,
-            app="primary-localpv",
-            config={
+        pools = {
+            "primary-localpv": {
                 "namespace": PRIMARY_NAMESPACE,
                 "storage-class-name": "primary-sc",
                 "node-selector": "storagePool=primary",
                 "create-namespace": True,
             },
-        )
-        juju.deploy(
-            charm=charm_path,
-            app="secondary-localpv",
-            config={
+            "secondary-localpv": {
                 "namespace": SECONDARY_NAMESPACE,
                 "storage-class-name": "secondary-sc",
                 "node-selector": "storagePool=secondary",
                 "create-namespace": True,
             },
-        )
+        }
+
+        with ThreadPoolExecutor(max_workers=len(pools)) as executor:
+            deploys = [
+                executor.submit(juju.deploy, charm=charm_path, app=app, config=app_config)
+                for app, app_config in pools.items()
+            ]
+            for deploy in deploys:
+                deploy.result()
 
-        juju.integrate("k8s", "primary-localpv:kubernetes")
-        juju.integrate("k8s", "secondary-localpv:kubernetes")
+            integrations = [
+                executor.submit(juju.integrate, "k8s", f"{app}:kubernetes") for app in pools
+            ]
+            for integration in integrations:
+                integration.result()
 
-        juju.wait(jubilant.all_active)
+        juju.wait(jubilant.all_active, delay=utils.JUJU_WAIT_DELAY)
 
-    def test_storage_classes_created(self, kubeconfig: Path):
+    def test_storage_classes_created(self, k8s_clients: SimpleNamespace):
         """Verify that storage classes are created after deployment.
 
         This test ensures that the charm properly creates the configured
         storage classes in the Kubernetes cluster.
         """
-        config.load_kube_config(str(kubeconfig))
-        storage_api = client.StorageV1Api()
+        storage_api = k8s_clients.storage_v1
 
         assert utils.verify_storage_class_exists(storage_api, "primary-sc"), (
             "Primary storage class 'primary-sc' was not created"
@@ -103,20 +104,7 @@ class TestDeployment:
 class TestStorageProvisioning:
     """Test suite for storage provisioning and data persistence."""
 
-    @staticmethod
-    def _load_manifests(manifest_file: Path) -> List[dict]:
-        """Load all manifests from a YAML file.
-
-        Args:
-            manifest_file: Path to the YAML manifest file.
-
-        Returns:
-            List of manifest dictionaries.
-        """
-        with manifest_file.open() as f:
-            return list(yaml.safe_load_all(f))
-
-    def test_multiple_providers(self, kubeconfig: Path):
+    def test_multiple_providers(self, k8s_clients: SimpleNamespace):
         """Test that multiple storage providers can provision volumes independently.
 
         This test verifies:
@@ -128,50 +116,60 @@ class TestStorageProvisioning:
         The test uses a cleanup context manager to ensure resources
         are deleted even if the test fails.
         """
-        config.load_kube_config(str(kubeconfig))
-        api_client = client.ApiClient()
-        core_v1 = client.CoreV1Api(api_client)
-        manifests_path = Path("tests/integration/data")
-        primary_manifests = manifests_path / "primary-pod.yaml"
-        secondary_manifest = manifests_path / "secondary-pod.yaml"
+        api_client = k8s_clients.api
+        core_v1 = k8s_clients.core_v1
+        # Each manifest creates exactly the resources the cleanup tracks for it.
+        pool_manifests = {
+            DATA_PATH / "primary-pod.yaml": PRIMARY_RESOURCES,
+            DATA_PATH / "secondary-pod.yaml": SECONDARY_RESOURCES,
+        }
+        manifest_files = list(pool_manifests)
 
-        all_resources = PRIMARY_RESOURCES + SECONDARY_RESOURCES
+        all_resources = [rsc for resources in pool_manifests.values() for rsc in resources]
 
         with utils.k8s_resource_cleanup(api_client, all_resources, namespace=DEFAULT_NAMESPACE):
-            # Create all resources from manifests
-            for manifest_file in [primary_manifests, secondary_manifest]:
-                for manifest in self._load_manifests(manifest_file):
-                    k8s_utils.create_from_dict(api_client, manifest)
-                    logger.info(
-                        "Created %s '%s'",
-                        manifest.get("kind"),
-                        manifest.get("metadata", {}).get("name"),
+            # Create all resources from manifests, one file per storage pool
+            with ThreadPoolExecutor(max_workers=max(1, len(manifest_files))) as executor:
+                creations = [
+                    executor.submit(k8s_utils.create_from_yaml, api_client, str(manifest_file))
+                    for manifest_file in manifest_files
+                ]
+                for creation in creations:
+                    creation.result()
+            logger.info("Created resources from %s", ", ".join(map(str, manifest_files)))
+
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                # Wait for PVCs to be bound first (ensures storage provisioning works)
+                pvc_waits = [
+                    executor.submit(
+                        utils.wait_for_pvc_bound,
+                        core_v1,
+                        pvc_name,
+                        DEFAULT_NAMESPACE,
+                        timeout=utils.PVC_WAIT_TIMEOUT,
                     )
+                    for pvc_name in ("primary-pvc", "secondary-pvc")
+                ]
+                for pvc_wait in pvc_waits:
+                    pvc_wait.result()
+
+                # Wait for pods to be running
+                pod_waits = [
+                    executor.submit(
+                        utils.wait_for_pod,
+                        core_v1,
+                        pod_name,
+                        DEFAULT_NAMESPACE,
+                        target_state="Running",
+                        timeout=utils.POD_WAIT_TIMEOUT,
+                    )
+                    for pod_name in ("primary-pod", "secondary-pod")
+                ]
+                for pod_wait in pod_waits:
+                    pod_wait.result()
 
-            # Wait for PVCs to be bound first (ensures storage provisioning works)
-            utils.wait_for_pvc_bound(
-                core_v1, "primary-pvc", DEFAULT_NAMESPACE, timeout=utils.PVC_WAIT_TIMEOUT
-            )
-            utils.wait_for_pvc_bound(
-                core_v1, "secondary-pvc", DEFAULT_NAMESPACE, timeout=utils.PVC_WAIT_TIMEOUT
-            )
-
-            # Wait for pods to be running
-            utils.wait_for_pod(
-                core_v1,
-                "primary-pod",
-                DEFAULT_NAMESPACE,
-                target_state="Running",
-                timeout=utils.POD_WAIT_TIMEOUT,
-            )
-            utils.wait_for_pod(
-                core_v1,
-                "secondary-pod",
-                DEFAULT_NAMESPACE,
-                target_state="Running",
-                timeout=utils.POD_WAIT_TIMEOUT,
-            )
-
+            # NOTE: The reads stay sequential, kubernetes.stream swaps the
+            # request method of the shared ApiClient while it runs.
             # Verify data was written correctly to each storage pool
             primary_content = utils.read_file_from_pod(
                 core_v1, "primary-pod", "/data/primary.txt", namespace=DEFAULT_NAMESPACE
@@ -200,78 +198,27 @@ class TestVolumeLifecycle:
     def csi_provisioner(self) -> str:
         return f"{self.PRIMARY_APP_NAME}-{self.CSI_DRIVER_BASE}"
 
-    def test_volume_deletion_with_delete_policy(self, kubeconfig: Path):
-        """Test that PV is deleted when PVC is deleted with 'Delete' reclaim policy."""
-        config.load_kube_config(str(kubeconfig))
-        core_v1 = client.CoreV1Api()
-        storage_api = client.StorageV1Api()
-
-        sc_name = "test-delete-policy-sc"
-        pvc_name = "test-delete-policy-pvc"
-        pod_name = "test-delete-policy-pod"
-        namespace = DEFAULT_NAMESPACE
-
-        with (
-            utils.managed_storage_class(
-                storage_api,
-                name=sc_name,
-                provisioner=self.csi_provisioner,
-                reclaim_policy="Delete",
-            ),
-            utils.managed_pvc(
-                core_v1,
-                name=pvc_name,
-                namespace=namespace,
-                storage_class=sc_name,
-                size="1Gi",
-            ),
-            utils.managed_pod(
-                core_v1,
-                pod_name=pod_name,
-                pvc_name=pvc_name,
-                namespace=namespace,
-                node_selector={"storagePool": "primary"},
-            ),
-        ):
-            utils.wait_for_pvc_bound(core_v1, pvc_name, namespace, timeout=utils.PVC_WAIT_TIMEOUT)
-
-            pv_name = utils.get_pv_for_pvc(core_v1, pvc_name, namespace)
-            assert pv_name is not None, f"PVC '{pvc_name}' is not bound to any PV"
-
-            reclaim_policy = utils.get_pv_reclaim_policy(core_v1, pv_name)
-            assert reclaim_policy == "Delete", (
-                f"Expected reclaim policy 'Delete' but got '{reclaim_policy}'"
-            )
-
-        # Pod is deleted when exiting managed_pod context
-        utils.wait_for_pod_deleted(core_v1, pod_name, namespace)
+    @pytest.mark.parametrize("policy", ["Delete", "Retain"])
+    def test_volume_reclaim_policy(self, k8s_clients: SimpleNamespace, policy: str):
+        """Test that the PV follows the StorageClass reclaim policy once its PVC is deleted.
 
-        # PVC is deleted when exiting managed_pvc context
-        utils.wait_for_pvc_deleted(core_v1, pvc_name, namespace)
-
-        # Verify PV is deleted
-        utils.wait_for_pv_deleted(core_v1, pv_name, timeout=utils.PVC_WAIT_TIMEOUT)
-
-        logger.info("Successfully verified: PV '%s' was deleted after PVC deletion", pv_name)
-
-    def test_volume_retain_policy(self, kubeconfig: Path):
-        """Test that PV is retained when PVC is deleted with 'Retain' reclaim policy."""
-        config.load_kube_config(str(kubeconfig))
-        core_v1 = client.CoreV1Api()
-        storage_api = client.StorageV1Api()
+        With 'Delete' the PV is removed, with 'Retain' it is kept as 'Released'.
+        """
+        core_v1 = k8s_clients.core_v1
+        storage_api = k8s_clients.storage_v1
 
-        sc_name = "test-retain-policy-sc"
-        pvc_name = "test-retain-policy-pvc"
-        pod_name = "test-retain-policy-pod"
+        prefix = f"test-{policy.lower()}-policy"
+        sc_name = f"{prefix}-sc"
+        pvc_name = f"{prefix}-pvc"
+        pod_name = f"{prefix}-pod"
         namespace = DEFAULT_NAMESPACE
-        pv_name = None
 
         with (
             utils.managed_storage_class(
                 storage_api,
                 name=sc_name,
                 provisioner=self.csi_provisioner,
-                reclaim_policy="Retain",
+                reclaim_policy=policy,
             ),
             utils.managed_pvc(
                 core_v1,
@@ -294,8 +241,8 @@ class TestVolumeLifecycle:
             assert pv_name is not None, f"PVC '{pvc_name}' is not bound to any PV"
 
             reclaim_policy = utils.get_pv_reclaim_policy(core_v1, pv_name)
-            assert reclaim_policy == "Retain", (
-                f"Expected reclaim policy 'Retain' but got '{reclaim_policy}'"
+            assert reclaim_policy == policy, (
+                f"Expected reclaim policy '{policy}' but got '{reclaim_policy}'"
             )
 
         # Pod is deleted when exiting managed_pod context
@@ -304,6 +251,12 @@ class TestVolumeLifecycle:
         # PVC is deleted when exiting managed_pvc context
         utils.wait_for_pvc_deleted(core_v1, pvc_name, namespace)
 
+        if policy == "Delete":
+            # Verify PV is deleted
+            utils.wait_for_pv_deleted(core_v1, pv_name, timeout=utils.PVC_WAIT_TIMEOUT)
+            logger.info("Successfully verified: PV '%s' was deleted after PVC deletion", pv_name)
+            return
+
         # Verify PV is retained (not deleted)
         assert utils.pv_exists(core_v1, pv_name), (
             f"PV '{pv_name}' was deleted but should have been retained"
@@ -2,25 +2,99 @@
 # See LICENSE file for licensing details.
 
 import logging
-import pprint
 import shlex
 import time
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import contextmanager
-from typing import Generator, List, Optional
+from typing import Any, Callable, Dict, Generator, List, Optional
 
 import pytest
 from kubernetes import client, stream, watch
-from kubernetes.client.models import EventsV1EventList
-from tenacity import retry, stop_after_attempt, wait_fixed
+from kubernetes.client.models import CoreV1EventList
+from tenacity import (
+    retry,
+    retry_if_exception_type,
+    stop_after_attempt,
+    wait_exponential,
+    wait_random,
+)
 
 log = logging.getLogger(__name__)
 
 # Timeout constants (in seconds)
 POD_WAIT_TIMEOUT = 300
 PVC_WAIT_TIMEOUT = 120
-RETRY_INTERVAL = 5
+# Seconds between `juju status` calls while waiting on deployments that
+# take minutes to settle.
+JUJU_WAIT_DELAY = 10
 MAX_RETRIES = 10
 
+# NOTE: Deletes return without waiting on dependents, tests that depend on
+# the removal use the wait_for_*_deleted helpers.
+BACKGROUND_DELETE = client.V1DeleteOptions(propagation_policy="Background")
+
+# NOTE: Watches started from resource version "0" are served from the API
+# server's cache, and open with an ADDED event for the current state of the
+# watched object, so a state reached before the watch started is not missed.
+WATCH_FROM_CACHE = {"resource_version": "0", "allow_watch_bookmarks": True}
+
+
+def _watch_named(
+    list_func: Callable,
+    name: str,
+    namespace: str,
+    timeout: int,
+) -> Generator[Any, None, None]:
+    """Yield the states of a named resource until the timeout expires.
+
+    The watch is restarted if the server closes it before the deadline, and
+    stops at the deadline even if the server keeps sending events.
+
+    Args:
+        list_func: Kubernetes api namespaced list function for the resource kind.
+        name: Name of the resource.
+        namespace: Namespace of the resource.
+        timeout: Maximum seconds to watch for.
+
+    Yields:
+        The resource, each time it is reported by the watch.
+    """
+    deadline = time.monotonic() + timeout
+    k8s_watch = watch.Watch()
+    while (remaining := deadline - time.monotonic()) > 0:
+        for event in k8s_watch.stream(
+            func=list_func,
+            namespace=namespace,
+            field_selector=f"metadata.name={name}",
+            **WATCH_FROM_CACHE,
+            timeout_seconds=max(1, int(remaining)),
+        ):
+            if event["type"] == "BOOKMARK":
+                continue
+            yield event["object"]
+            if time.monotonic() >= deadline:
+                k8s_watch.stop()
+                return
+
+
+def _dump_events(core_api: client.CoreV1Api, name: str, namespace: str) -> None:
+    """Log the events involving a resource, to help diagnose a timeout.
+
+    Args:
+        core_api: Instance of CoreV1 kubernetes api.
+        name: Name of the resource.
+        namespace: Namespace of the resource.
+    """
+    events: CoreV1EventList = core_api.list_namespaced_event(
+        namespace, field_selector=f"involvedObject.name={name}"
+    )
+    lines = [
+        f"{event.type}\t{event.reason}\t"
+        f"{event.source.component if event.source else '-'}\t{event.message}"
+        for event in events.items
+    ]
+    log.info("Events of '%s':\n%s", name, "\n".join(lines))
+
 
 def wait_for_pvc_bound(
     core_api: client.CoreV1Api,
@@ -39,24 +113,19 @@ def wait_for_pvc_bound(
     Raises:
         pytest.fail: If PVC does not become Bound within timeout.
     """
-    k8s_watch = watch.Watch()
     log.info("Waiting for PVC '%s' in namespace '%s' to become Bound", name, namespace)
 
-    for event in k8s_watch.stream(
-        func=core_api.list_namespaced_persistent_volume_claim,
-        namespace=namespace,
-        timeout_seconds=timeout,
+    for resource in _watch_named(
+        core_api.list_namespaced_persistent_volume_claim, name, namespace, timeout
     ):
-        resource = event["object"]
-        if resource.metadata.name != name:
-            continue
         pvc_phase = resource.status.phase
         log.debug("PVC %s phase: %s", name, pvc_phase)
         if pvc_phase == "Bound":
             log.info("PVC '%s' is now Bound", name)
-            k8s_watch.stop()
             return
 
+    log.info(f"PVC was not bound within allotted timeout: '{timeout}s'")
+    _dump_events(core_api, name, namespace)
     pytest.fail(f"Timeout after {timeout}s waiting for PVC '{name}' to become Bound")
 
 
@@ -79,50 +148,43 @@ def wait_for_pod(
     Raises:
         pytest.fail: If pod does not reach target_state within timeout.
     """
-    k8s_watch = watch.Watch()
-
     log.info("Waiting for pod '%s' to reach state '%s'", name, target_state)
-    for event in k8s_watch.stream(
-        func=core_api.list_namespaced_pod, namespace=namespace, timeout_seconds=timeout
-    ):
-        resource = event["object"]
-        if resource.metadata.name != name:
-            continue
+    for resource in _watch_named(core_api.list_namespaced_pod, name, namespace, timeout):
         pod_state = resource.status.phase
         log.debug("Pod '%s' state: %s (waiting for %s)", name, pod_state, target_state)
         if pod_state == target_state:
             log.info("Pod '%s' reached target state '%s'", name, target_state)
-            k8s_watch.stop()
             return
         if pod_state == "Failed":
-            k8s_watch.stop()
             pytest.fail(f"Pod '{name}' entered Failed state")
-    else:
-        log.info(f"Pod failed to start within allotted timeout: '{timeout}s'")
-        events: EventsV1EventList = core_api.list_namespaced_event(
-            namespace, field_selector=f"involvedObject.name={name}"
-        )
-        for event in events.items:
-            event_interest = ", ".join(
-                [event.type, event.reason, pprint.pformat(event.source), event.message]
-            )
-            log.info(event_interest)
-        pytest.fail(
-            "Timeout after {}s while waiting for {} pod to reach {} status".format(
-                timeout, name, target_state
-            )
+
+    log.info(f"Pod failed to start within allotted timeout: '{timeout}s'")
+    _dump_events(core_api, name, namespace)
+    pytest.fail(
+        "Timeout after {}s while waiting for {} pod to reach {} status".format(
+            timeout, name, target_state
         )
+    )
 
 
-@retry(stop=stop_after_attempt(5), wait=wait_fixed(2), reraise=True)
-def read_file_from_pod(
+# Line printed ahead of each file by read_files_from_pod.
+FILE_SEPARATOR = "--- read_files_from_pod ---"
+
+
+@retry(
+    stop=stop_after_attempt(5),
+    wait=wait_exponential(multiplier=0.1, max=2) + wait_random(0, 0.2),
+    retry=retry_if_exception_type((client.ApiException, OSError)),
+    reraise=True,
+)
+def read_files_from_pod(
     core_v1: client.CoreV1Api,
     pod_name: str,
-    file_path: str,
+    file_paths: List[str],
     namespace: str = "default",
     container: Optional[str] = None,
-) -> str:
-    """Read a file from a pod using kubernetes exec.
+) -> Dict[str, str]:
+    """Read files from a pod using a single kubernetes exec.
 
     This function includes retry logic to handle transient failures
     that may occur when the pod is still initializing.
@@ -130,17 +192,21 @@ def read_file_from_pod(
     Args:
         core_v1: Instance of CoreV1 kubernetes api.
         pod_name: Name of the pod to read from.
-        file_path: Path to the file inside the pod.
+        file_paths: Paths to the files inside the pod.
         namespace: Namespace of the pod.
         container: Specific container name (optional).
 
     Returns:
-        Contents of the file as a string.
+        Contents of each file as a string, keyed by file path.
 
     Raises:
-        Exception: If file cannot be read after all retries.
+        Exception: If the files cannot be read after all retries.
     """
-    exec_cmd = ["/bin/sh", "-c", f"cat {shlex.quote(file_path)}"]
+    script = "; ".join(
+        f"printf '\\n%s\\n' {shlex.quote(FILE_SEPARATOR)}; cat {shlex.quote(file_path)}"
+        for file_path in file_paths
+    )
+    exec_cmd = ["/bin/sh", "-c", script]
     kwargs = {
         "command": exec_cmd,
         "stderr": True,
@@ -158,13 +224,46 @@ def read_file_from_pod(
             namespace,
             **kwargs,
         )
-        content = resp.strip()
-        log.debug("Read %d bytes from %s:%s", len(content), pod_name, file_path)
-        return content
     except Exception as e:
-        log.error("Failed to read file %s from pod %s: %s", file_path, pod_name, e)
+        log.error("Failed to read files %s from pod %s: %s", file_paths, pod_name, e)
         raise
 
+    _, *contents = resp.split(f"\n{FILE_SEPARATOR}\n")
+    if len(contents) != len(file_paths):
+        raise RuntimeError(f"Unexpected output reading {file_paths} from pod {pod_name}: {resp}")
+
+    files = {}
+    for file_path, content in zip(file_paths, contents):
+        files[file_path] = content.strip()
+        log.debug("Read %d bytes from %s:%s", len(files[file_path]), pod_name, file_path)
+    return files
+
+
+def read_file_from_pod(
+    core_v1: client.CoreV1Api,
+    pod_name: str,
+    file_path: str,
+    namespace: str = "default",
+    container: Optional[str] = None,
+) -> str:
+    """Read a file from a pod using kubernetes exec.
+
+    Args:
+        core_v1: Instance of CoreV1 kubernetes api.
+        pod_name: Name of the pod to read from.
+        file_path: Path to the file inside the pod.
+        namespace: Namespace of the pod.
+        container: Specific container name (optional).
+
+    Returns:
+        Contents of the file as a string.
+
+    Raises:
+        Exception: If file cannot be read after all retries.
+    """
+    files = read_files_from_pod(core_v1, pod_name, [file_path], namespace, container)
+    return files[file_path]
+
 
 @contextmanager
 def k8s_resource_cleanup(
@@ -182,23 +281,30 @@ def k8s_resource_cleanup(
     Yields:
         None
     """
-    core_v1 = client.CoreV1Api(api_client)
+
+    def delete(core_v1: client.CoreV1Api, resource: dict) -> None:
+        kind = resource.get("kind", "").lower()
+        name = resource.get("name", "")
+        try:
+            if kind == "pod":
+                delete_pod(core_v1, name, namespace)
+            elif kind == "persistentvolumeclaim":
+                delete_pvc(core_v1, name, namespace)
+        except client.ApiException as e:
+            if e.status != 404:
+                log.warning("Failed to delete %s '%s': %s", kind, name, e)
+
     try:
         yield
     finally:
-        for resource in resources:
-            kind = resource.get("kind", "").lower()
-            name = resource.get("name", "")
-            try:
-                if kind == "pod":
-                    core_v1.delete_namespaced_pod(name, namespace, grace_period_seconds=0)
-                    log.info("Deleted pod '%s'", name)
-                elif kind == "persistentvolumeclaim":
-                    core_v1.delete_namespaced_persistent_volume_claim(name, namespace)
-                    log.info("Deleted PVC '%s'", name)
-            except client.ApiException as e:
-                if e.status != 404:
-                    log.warning("Failed to delete %s '%s': %s", kind, name, e)
+        if resources:
+            core_v1 = client.CoreV1Api(api_client)
+            # NOTE: The deletions are independent, issue them concurrently so
+            # the cleanup costs about one round-trip.
+            with ThreadPoolExecutor(max_workers=min(8, len(resources))) as executor:
+                deletions = [executor.submit(delete, core_v1, resource) for resource in resources]
+                for deletion in deletions:
+                    deletion.result()
 
 
 @contextmanager
@@ -349,6 +455,57 @@ def verify_storage_class_exists(
         raise
 
 
+def _wait_deleted(
+    list_func: Callable,
+    kind: str,
+    name: str,
+    timeout: int,
+    **list_kwargs,
+) -> None:
+    """Wait for a named resource to be deleted.
+
+    The resource is listed by name, and while it still exists its events are
+    watched from that listing until it is deleted. If the server closes the
+    watch early, or the listed version expires, the resource is listed again
+    and the watch restarted until the timeout expires.
+
+    Args:
+        list_func: Kubernetes api list function for the resource kind.
+        kind: Kind of the resource, used in log and failure messages.
+        name: Name of the resource.
+        timeout: Maximum seconds to wait for the deletion.
+        **list_kwargs: Extra arguments for list_func (e.g.: namespace).
+
+    Raises:
+        pytest.fail: If the resource is not deleted within timeout.
+    """
+    log.info("Waiting for %s '%s' to be deleted", kind, name)
+    field_selector = f"metadata.name={name}"
+    deadline = time.monotonic() + timeout
+    k8s_watch = watch.Watch()
+    while (resources := list_func(field_selector=field_selector, **list_kwargs)).items:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            pytest.fail(f"Timeout after {timeout}s waiting for {kind} '{name}' to be deleted")
+        try:
+            for event in k8s_watch.stream(
+                func=list_func,
+                field_selector=field_selector,
+                resource_version=resources.metadata.resource_version,
+                timeout_seconds=max(1, int(remaining)),
+                **list_kwargs,
+            ):
+                if event["type"] == "DELETED":
+                    k8s_watch.stop()
+                    break
+        except client.ApiException as e:
+            # NOTE: 410 Gone means the listed version expired, list again.
+            if e.status != 410:
+                raise
+
+    log.info("%s '%s' has been deleted", kind, name)
+
+
 def wait_for_pvc_deleted(
     core_api: client.CoreV1Api,
     name: str,
@@ -366,21 +523,9 @@ def wait_for_pvc_deleted(
     Raises:
         pytest.fail: If PVC is not deleted within timeout.
     """
-    log.info("Waiting for PVC '%s' to be deleted", name)
-    start_time = time.time()
-
-    while time.time() - start_time < timeout:
-        try:
-            core_api.read_namespaced_persistent_volume_claim(name, namespace)
-            log.debug("PVC '%s' still exists, waiting...", name)
-            time.sleep(RETRY_INTERVAL)
-        except client.ApiException as e:
-            if e.status == 404:
-                log.info("PVC '%s' has been deleted", name)
-                return
-            raise
-
-    pytest.fail(f"Timeout after {timeout}s waiting for PVC '{name}' to be deleted")
+    _wait_deleted(
+        core_api.list_namespaced_persistent_volume_claim, "PVC", name, timeout, namespace=namespace
+    )
 
 
 def wait_for_pv_deleted(
@@ -398,21 +543,7 @@ def wait_for_pv_deleted(
     Raises:
         pytest.fail: If PV is not deleted within timeout.
     """
-    log.info("Waiting for PV '%s' to be deleted", name)
-    start_time = time.time()
-
-    while time.time() - start_time < timeout:
-        try:
-            core_api.read_persistent_volume(name)
-            log.debug("PV '%s' still exists, waiting...", name)
-            time.sleep(RETRY_INTERVAL)
-        except client.ApiException as e:
-            if e.status == 404:
-                log.info("PV '%s' has been deleted", name)
-                return
-            raise
-
-    pytest.fail(f"Timeout after {timeout}s waiting for PV '{name}' to be deleted")
+    _wait_deleted(core_api.list_persistent_volume, "PV", name, timeout)
 
 
 def get_pv_for_pvc(
@@ -534,7 +665,7 @@ def delete_storage_class(
         name: Name of the storage class to delete.
     """
     try:
-        storage_api.delete_storage_class(name)
+        storage_api.delete_storage_class(name, body=BACKGROUND_DELETE)
         log.info("Deleted storage class '%s'", name)
     except client.ApiException as e:
         if e.status != 404:
@@ -595,7 +726,7 @@ def delete_pvc(
         namespace: Namespace of the PVC.
     """
     try:
-        core_api.delete_namespaced_persistent_volume_claim(name, namespace)
+        core_api.delete_namespaced_persistent_volume_claim(name, namespace, body=BACKGROUND_DELETE)
         log.info("Deleted PVC '%s'", name)
     except client.ApiException as e:
         if e.status != 404:
@@ -613,7 +744,7 @@ def delete_pv(
         name: Name of the PV.
     """
     try:
-        core_api.delete_persistent_volume(name)
+        core_api.delete_persistent_volume(name, body=BACKGROUND_DELETE)
         log.info("Deleted PV '%s'", name)
     except client.ApiException as e:
         if e.status != 404:
@@ -690,7 +821,13 @@ def delete_pod(
         grace_period: Grace period in seconds for pod termination.
     """
     try:
-        core_api.delete_namespaced_pod(name, namespace, grace_period_seconds=grace_period)
+        core_api.delete_namespaced_pod(
+            name,
+            namespace,
+            body=client.V1DeleteOptions(
+                propagation_policy="Background", grace_period_seconds=grace_period
+            ),
+        )
         log.info("Deleted pod '%s'", name)
     except client.ApiException as e:
         if e.status != 404:
@@ -714,18 +851,4 @@ def wait_for_pod_deleted(
     Raises:
         pytest.fail: If pod is not deleted within timeout.
     """
-    log.info("Waiting for pod '%s' to be deleted", name)
-    start_time = time.time()
-
-    while time.time() - start_time < timeout:
-        try:
-            core_api.read_namespaced_pod(name, namespace)
-            log.debug("Pod '%s' still exists, waiting...", name)
-            time.sleep(RETRY_INTERVAL)
-        except client.ApiException as e:
-            if e.status == 404:
-                log.info("Pod '%s' has been deleted", name)
-                return
-            raise
-
-    pytest.fail(f"Timeout after {timeout}s waiting for pod '{name}' to be deleted")
+    _wait_deleted(core_api.list_namespaced_pod, "Pod", name, timeout, namespace=namespace)
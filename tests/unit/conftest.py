@@ -0,0 +1,87 @@
+# Copyright 2025 Canonical Ltd.
+# See LICENSE file for licensing details.
+
+from contextlib import ExitStack
+from types import SimpleNamespace
+from typing import Any, Iterator
+from unittest.mock import Mock, patch
+
+import pytest
+from lightkube import Client
+from ops import testing
+
+from charm import RawfileLocalPVOperatorCharm
+
+
+@pytest.fixture(scope="session")
+def ctx() -> testing.Context:
+    """Return a Context for the charm, loading its metadata once per session."""
+    return testing.Context(RawfileLocalPVOperatorCharm)
+
+
+@pytest.fixture(scope="session")
+def events(ctx: testing.Context) -> SimpleNamespace:
+    """Return the hook events the tests emit, built once from the shared Context."""
+    return SimpleNamespace(
+        start=ctx.on.start(),
+        config_changed=ctx.on.config_changed(),
+        remove=ctx.on.remove(),
+    )
+
+
+@pytest.fixture(scope="session")
+def leader_state() -> testing.State:
+    """Return a bare leader State; derive variants with dataclasses.replace."""
+    return testing.State(leader=True)
+
+
+@pytest.fixture(scope="session")
+def _client_mock() -> Mock:
+    return Mock(spec=Client)
+
+
+@pytest.fixture
+def fake_client(_client_mock: Mock) -> Mock:
+    """Return the shared lightkube Client mock, reset to an empty cluster."""
+    _client_mock.reset_mock(return_value=True, side_effect=True)
+    _client_mock.list.return_value = []
+    return _client_mock
+
+
+class _Const:
+    """Class attribute that returns a fixed value without recording accesses."""
+
+    def __init__(self) -> None:
+        self.value: Any = None
+
+    def __get__(self, obj: Any, objtype: Any = None) -> Any:
+        return self.value
+
+
+@pytest.fixture(scope="module")
+def _module_patches() -> Iterator[SimpleNamespace]:
+    with ExitStack() as stack:
+        yield SimpleNamespace(
+            charm_client=stack.enter_context(
+                patch.object(RawfileLocalPVOperatorCharm, "_client", new=_Const())
+            ),
+            manifests_client=stack.enter_context(
+                patch("ops.manifests.Manifests.client", new=_Const())
+            ),
+            delete_manifests=stack.enter_context(
+                patch("ops.manifests.Manifests.delete_manifests")
+            ),
+        )
+
+
+@pytest.fixture(autouse=True)
+def patched(_module_patches: SimpleNamespace) -> SimpleNamespace:
+    """Reset the module-wide patches and return them.
+
+    Both clients default to a bare Mock(spec=Client); tests swap in
+    fake_client through their ``value``.
+    """
+    _module_patches.charm_client.value = Mock(spec=Client)
+    _module_patches.manifests_client.value = Mock(spec=Client)
+    _module_patches.delete_manifests.reset_mock()
+    return _module_patches
@@ -3,105 +3,99 @@
 #
 # Learn more about testing at: https://juju.is/docs/sdk/testing
 
-from unittest.mock import MagicMock, PropertyMock, patch
+from dataclasses import replace
+from types import SimpleNamespace
+from typing import Dict, Optional, Tuple
+from unittest.mock import Mock
 
 import httpx
+import pytest
 from lightkube.core.exceptions import ApiError
 from lightkube.models.meta_v1 import ObjectMeta
 from lightkube.resources.apps_v1 import DaemonSet
 from ops import testing
 from ops.manifests import ManifestClientError
 
-from charm import RawfileLocalPVOperatorCharm
-
 
 class FakeApiError(ApiError):
-    def __init__(self, *args, **kwargs) -> None:
-        response = httpx.Response(status_code=404, content="{}")
-        super().__init__(response=response)
-        self.status.code = 404
-
-
-@patch.object(RawfileLocalPVOperatorCharm, "_client", new_callable=PropertyMock)
-@patch("ops.manifests.Manifests.client", new_callable=PropertyMock)
-def test_base(mock_manifest_client, _: PropertyMock):
-    fake_client = MagicMock()
-    fake_client.get.side_effect = ManifestClientError
-    fake_client.list.return_value = []
+    def __init__(self) -> None:
+        status = {"code": 404, "message": "Not Found", "reason": "NotFound"}
+        super().__init__(response=httpx.Response(status_code=404, json=status))
 
-    mock_manifest_client.return_value = fake_client
 
-    ctx = testing.Context(RawfileLocalPVOperatorCharm)
-    state = testing.State(leader=True)
-    out = ctx.run(ctx.on.start(), state)
-    assert out.unit_status == testing.ActiveStatus("Ready")
+def _raise_not_found(*args, **kwargs):
+    # NOTE: A fresh exception per call, so tracebacks never carry over.
+    raise FakeApiError()
 
 
-@patch.object(RawfileLocalPVOperatorCharm, "_client", new_callable=PropertyMock)
-def test_blocks_when_missing_ns_not_managed(mock_client):
-    fake_client = MagicMock()
-    fake_client.get.side_effect = FakeApiError()
-    mock_client.return_value = fake_client
+_FAKE_DS = DaemonSet(metadata=ObjectMeta(name="rawfile-csi-node", namespace="foo"))
+_EXISTING: Dict[Tuple[type, str, Optional[str]], DaemonSet] = {
+    (DaemonSet, "rawfile-csi-node", "foo"): _FAKE_DS,
+}
 
-    ns = "my-namespace"
-    ctx = testing.Context(RawfileLocalPVOperatorCharm)
-    state = testing.State(leader=True, config={"create-namespace": False, "namespace": ns})
-    out = ctx.run(ctx.on.config_changed(), state)
-    assert out.unit_status == testing.BlockedStatus(f"Missing namespace '{ns}'")
 
+def test_base(
+    ctx: testing.Context,
+    events: SimpleNamespace,
+    fake_client: Mock,
+    patched: SimpleNamespace,
+    leader_state: testing.State,
+):
+    fake_client.get.side_effect = ManifestClientError()
 
-@patch("ops.manifests.Manifests.client", new_callable=PropertyMock)
-@patch.object(RawfileLocalPVOperatorCharm, "_client", new_callable=PropertyMock)
-def test_create_namespace(mock_client, _):
-    fake_client = MagicMock()
-    fake_client.get.side_effect = FakeApiError()
-    mock_client.return_value = fake_client
+    patched.manifests_client.value = fake_client
 
-    ns = "my-namespace"
-    ctx = testing.Context(RawfileLocalPVOperatorCharm)
-    state = testing.State(config={"create-namespace": True, "namespace": ns})
-    out = ctx.run(ctx.on.config_changed(), state)
+    out = ctx.run(events.start, leader_state)
     assert out.unit_status == testing.ActiveStatus("Ready")
 
 
-@patch.object(RawfileLocalPVOperatorCharm, "_client", new_callable=PropertyMock)
-@patch("ops.manifests.Manifests.delete_manifests", new_callable=MagicMock())
-def test_remove_manifests(mock_delete: MagicMock, _: PropertyMock):
-    fake_client = MagicMock()
-    fake_client.get.side_effect = ManifestClientError
-    fake_client.list.return_value = []
-    fake_client.delete.return_value = None
-
-    ctx = testing.Context(RawfileLocalPVOperatorCharm)
-    state = testing.State(leader=True)
-    out = ctx.run(ctx.on.remove(), state)
-
-    mock_delete.assert_called_once()
-    stored_state = next(
-        (
-            stored
-            for stored in out.stored_states
-            if stored.owner_path == "RawfileLocalPVOperatorCharm"
-        ),
-        None,
-    )
-    assert stored_state
-    assert stored_state.content.get("is_terminating")
+def test_blocks_when_missing_ns_not_managed(
+    ctx: testing.Context,
+    events: SimpleNamespace,
+    fake_client: Mock,
+    patched: SimpleNamespace,
+    leader_state: testing.State,
+):
+    fake_client.get.side_effect = _raise_not_found
+    patched.charm_client.value = fake_client
 
+    ns = "my-namespace"
+    state = replace(leader_state, config={"create-namespace": False, "namespace": ns})
+    out = ctx.run(events.config_changed, state)
+    assert out.unit_status == testing.BlockedStatus(f"Missing namespace '{ns}'")
 
-@patch.object(RawfileLocalPVOperatorCharm, "_client", new_callable=PropertyMock)
-@patch("ops.manifests.Manifests.delete_manifests", new_callable=MagicMock())
-def test_remove_manifests_non_leader(mock_delete: MagicMock, _: PropertyMock):
-    fake_client = MagicMock()
-    fake_client.get.side_effect = ManifestClientError
-    fake_client.list.return_value = []
-    fake_client.delete.return_value = None
 
-    ctx = testing.Context(RawfileLocalPVOperatorCharm)
-    state = testing.State(leader=False)
-    out = ctx.run(ctx.on.remove(), state)
+def test_create_namespace(
+    ctx: testing.Context,
+    events: SimpleNamespace,
+    fake_client: Mock,
+    patched: SimpleNamespace,
+    leader_state: testing.State,
+):
+    fake_client.get.side_effect = _raise_not_found
+    patched.charm_client.value = fake_client
+    patched.manifests_client.value = fake_client
 
-    mock_delete.assert_not_called()
+    ns = "my-namespace"
+    state = replace(leader_state, config={"create-namespace": True, "namespace": ns})
+    out = ctx.run(events.config_changed, state)
+    assert out.unit_status == testing.ActiveStatus("Ready")
+    (created,), _ = fake_client.create.call_args
+    assert created.metadata.name == ns
+
+
+@pytest.mark.parametrize("leader, expect_called", [(True, True), (False, False)])
+def test_remove_manifests(
+    leader: bool,
+    expect_called: bool,
+    ctx: testing.Context,
+    events: SimpleNamespace,
+    patched: SimpleNamespace,
+):
+    state = testing.State(leader=leader)
+    out = ctx.run(events.remove, state)
+
+    assert patched.delete_manifests.call_count == int(expect_called)
     stored_state = next(
         (
             stored
@@ -114,46 +108,43 @@ def test_remove_manifests_non_leader(mock_delete: MagicMock, _: PropertyMock):
     assert stored_state.content.get("is_terminating")
 
 
-@patch.object(RawfileLocalPVOperatorCharm, "_client", new_callable=PropertyMock)
-@patch("ops.manifests.Manifests.client", new_callable=PropertyMock)
-def test_apply_manifests(mock_manifest_client: MagicMock, _: PropertyMock):
-    fake_client = MagicMock()
+def test_apply_manifests(
+    ctx: testing.Context,
+    events: SimpleNamespace,
+    fake_client: Mock,
+    patched: SimpleNamespace,
+    leader_state: testing.State,
+):
     fake_client.apply.side_effect = ManifestClientError("Foo!")
-    fake_client.get.side_effect = FakeApiError()
-    fake_client.list.return_value = []
-    fake_client.delete.return_value = None
-    fake_client.send.return_value = []
+    fake_client.get.side_effect = _raise_not_found
 
-    mock_manifest_client.return_value = fake_client
+    patched.manifests_client.value = fake_client
 
-    ctx = testing.Context(RawfileLocalPVOperatorCharm)
-    state = testing.State(leader=True, config={"create-namespace": True})
-    out = ctx.run(ctx.on.config_changed(), state)
+    state = replace(leader_state, config={"create-namespace": True})
+    out = ctx.run(events.config_changed, state)
 
     assert out.unit_status == testing.WaitingStatus("Foo!")
 
 
-@patch.object(RawfileLocalPVOperatorCharm, "_client", new_callable=PropertyMock)
-@patch("ops.manifests.Manifests.client", new_callable=PropertyMock)
-def test_conflicts(mock_manifest_client: MagicMock, _: PropertyMock):
-    fake_client = MagicMock()
-    fake_ds = DaemonSet(metadata=ObjectMeta(name="rawfile-csi-node", namespace="foo"))
-
+def test_conflicts(
+    ctx: testing.Context,
+    events: SimpleNamespace,
+    fake_client: Mock,
+    patched: SimpleNamespace,
+    leader_state: testing.State,
+):
     def get_side_effect(resource_type, name, namespace=None, **kwargs):
-        if resource_type is DaemonSet and name == "rawfile-csi-node" and namespace == "foo":
-            return fake_ds
-        raise FakeApiError()
+        found = _EXISTING.get((resource_type, name, namespace))
+        if found is None:
+            raise FakeApiError()
+        return found
 
     fake_client.get.side_effect = get_side_effect
-    fake_client.list.return_value = []
-    fake_client.delete.return_value = None
-    fake_client.send.return_value = []
 
-    mock_manifest_client.return_value = fake_client
+    patched.manifests_client.value = fake_client
 
-    ctx = testing.Context(RawfileLocalPVOperatorCharm)
-    state = testing.State(leader=True, config={"create-namespace": True, "namespace": "foo"})
-    out = ctx.run(ctx.on.config_changed(), state)
+    state = replace(leader_state, config={"create-namespace": True, "namespace": "foo"})
+    out = ctx.run(events.config_changed, state)
 
     assert out.unit_status == testing.BlockedStatus(
         "1 Kubernetes resource collision (action: list-resources)"
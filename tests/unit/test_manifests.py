@@ -0,0 +1,110 @@
+# Copyright 2025 Canonical Ltd.
+# See LICENSE file for licensing details.
+
+from dataclasses import replace
+from types import SimpleNamespace
+from typing import ClassVar, FrozenSet, List
+from unittest.mock import Mock
+
+import pytest
+from lightkube import codecs
+from lightkube.codecs import AnyResource
+from ops import testing
+from ops.manifests import ManifestClientError, Patch
+
+from manifests import DispatchingPatchChain
+
+CONFIG = {
+    "namespace": "foo",
+    "node-selector": "node-role=storage",
+    "storage-class-name": "csi-rawfile-test",
+    "storage-class-reclaim-policy": "Retain",
+}
+
+
+class _Recorder(Patch):
+    """Patch recording the kind of every resource it is called with."""
+
+    def __init__(self, manifests, calls: List[str]):
+        super().__init__(manifests)
+        self.calls = calls
+
+    def __call__(self, obj: AnyResource) -> None:
+        self.calls.append(f"{type(self).__name__}:{obj.kind}")
+
+
+class _AnyKind(_Recorder):
+    pass
+
+
+class _DaemonSetOnly(_Recorder):
+    TARGET_KINDS: ClassVar[FrozenSet[str]] = frozenset({"DaemonSet"})
+
+
+def test_patch_chain_dispatches_by_kind():
+    calls: List[str] = []
+    manifests = Mock()
+    chain = DispatchingPatchChain(
+        manifests, [_DaemonSetOnly(manifests, calls), _AnyKind(manifests, calls)]
+    )
+
+    for doc in (
+        {"apiVersion": "apps/v1", "kind": "DaemonSet", "metadata": {"name": "ds"}},
+        {
+            "apiVersion": "storage.k8s.io/v1",
+            "kind": "StorageClass",
+            "metadata": {"name": "sc"},
+            "provisioner": "p",
+        },
+        {"apiVersion": "v1", "kind": "Service", "metadata": {"name": "svc"}},
+    ):
+        chain(codecs.from_dict(doc))
+
+    assert calls == [
+        "_DaemonSetOnly:DaemonSet",
+        "_AnyKind:DaemonSet",
+        "_AnyKind:StorageClass",
+        "_AnyKind:Service",
+    ]
+
+
+def _render(
+    ctx: testing.Context,
+    events: SimpleNamespace,
+    state: testing.State,
+    dispatch: bool,
+) -> List[dict]:
+    """Render the charm's manifests, through the patch chain or its patches directly."""
+    with ctx(events.start, state) as mgr:
+        manifests = mgr.charm.collector.manifests["rawfile-local-pv"]
+        if not dispatch:
+            (chain,) = manifests.manipulations
+            assert isinstance(chain, DispatchingPatchChain)
+            manifests.manipulations = list(chain.patches)
+        rendered = [rsc.resource.to_dict() for rsc in manifests.resources]
+        mgr.run()
+    return rendered
+
+
+@pytest.mark.parametrize("config", [{}, CONFIG], ids=["default", "configured"])
+def test_patch_chain_matches_direct_patches(
+    config: dict,
+    ctx: testing.Context,
+    events: SimpleNamespace,
+    fake_client: Mock,
+    patched: SimpleNamespace,
+    leader_state: testing.State,
+):
+    fake_client.get.side_effect = ManifestClientError()
+    patched.manifests_client.value = fake_client
+    state = replace(leader_state, config=config)
+
+    # NOTE: Each render builds its own charm, so the two never share the
+    # parsed manifest documents the patches write into.
+    dispatched = _render(ctx, events, state, dispatch=True)
+    direct = _render(ctx, events, state, dispatch=False)
+
+    assert dispatched == direct
+    if config:
+        storage_classes = [rsc for rsc in dispatched if rsc["kind"] == "StorageClass"]
+        assert [sc["metadata"]["name"] for sc in storage_classes] == ["csi-rawfile-test"]